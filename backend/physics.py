@@ -2,8 +2,22 @@
 Physics engine for asteroid impact calculations and orbital mechanics.
 """
 import numpy as np
-from typing import List, Tuple, Dict, Any
+from typing import Tuple, Dict, Any
 import math
+from functools import lru_cache, partial
+from numba import njit
+
+# JAX is optional: when present, trajectories go through an XLA-compiled
+# kernel (and pick up GPU dispatch for free); otherwise the Numba core runs
+try:
+    import jax
+    import jax.numpy as jnp
+    from jax import jit as jax_jit, lax
+    # Positions are ~1e11 m; float32 would lose ~1e4 m of precision
+    jax.config.update('jax_enable_x64', True)
+    HAS_JAX = True
+except ImportError:
+    HAS_JAX = False
 
 # Constants
 EARTH_RADIUS = 6371000  # meters
@@ -49,27 +63,38 @@ def estimate_crater_diameter(energy_mt: float, target_type: str = 'rock') -> flo
     """
     # Convert to joules
     energy_joules = energy_mt * TNT_ENERGY * 1e6
-    
-    # Holsapple-Schmidt scaling law
-    if target_type == 'rock':
-        # For rocky targets
-        diameter_m = 1.8 * (energy_joules / 1e12)**0.294
-    else:
-        # For water targets (smaller craters)
-        diameter_m = 1.2 * (energy_joules / 1e12)**0.294
-    
+
+    # Holsapple-Schmidt scaling law (water targets crater smaller)
+    coefficient = 1.8 if target_type == 'rock' else 1.2
+    diameter_m = _crater_scaling(energy_joules, coefficient)
+
     return diameter_m / 1000  # Convert to kilometers
 
-def calculate_trajectory(orbital_elements: Dict[str, float], time_steps: int = 100) -> List[List[float]]:
+@njit(cache=True, fastmath=True)
+def _crater_scaling(energy_joules: float, coefficient: float) -> float:
+    # fastmath lets LLVM lower the pow to an exp/log pair
+    return coefficient * (energy_joules / 1e12)**0.294
+
+@njit(cache=True, fastmath=True)
+def _fireball_scaling(energy_mt: float) -> float:
+    return 1.5 * energy_mt**0.4  # km
+
+def calculate_trajectory(orbital_elements: Dict[str, float], time_steps: int = 100,
+                         precision: str = 'normal', R: np.ndarray = None) -> np.ndarray:
     """
     Calculate asteroid trajectory from orbital elements.
-    
+
     Args:
         orbital_elements: Dictionary containing a, e, i, Ω, ω, M (Keplerian elements)
         time_steps: Number of points to calculate
-        
+        precision: 'normal' for the iterative Kepler solver, 'fast' for the
+            grid-interpolated solver (~1e-4 tolerance, suited to bulk sweeps)
+        R: Precomputed rotation matrix from _build_rotation_matrix. Pass it
+            when comparing orbits that differ only in 'a' (e.g. deflection):
+            the Kepler solution is then also reused via a small cache.
+
     Returns:
-        List of [x, y, z] coordinates in meters
+        (time_steps, 3) array of [x, y, z] coordinates in meters
     """
     a = orbital_elements.get('a', 1.5e11)  # semi-major axis in meters
     e = orbital_elements.get('e', 0.1)     # eccentricity
@@ -77,43 +102,243 @@ def calculate_trajectory(orbital_elements: Dict[str, float], time_steps: int = 1
     omega = orbital_elements.get('omega', 0)  # longitude of ascending node
     w = orbital_elements.get('w', 0)       # argument of periapsis
     M = orbital_elements.get('M', 0)       # mean anomaly
-    
+
     # Generate time array (one orbital period)
     T = 2 * math.pi * math.sqrt(a**3 / (G * EARTH_MASS))
-    times = np.linspace(0, T, time_steps)
-    
-    trajectory = []
-    
-    for t in times:
-        # Solve Kepler's equation for eccentric anomaly
+
+    if R is not None:
+        cos_E, sin_E = _eccentric_anomalies(M, e, time_steps)
+        r = a * (1 - e * cos_E)
+        # Rotate straight into a preallocated contiguous (n, 3) array -
+        # (R @ orb).T would allocate a view plus a transpose copy
+        orb = np.stack([r * cos_E, r * sin_E, np.zeros_like(r)], axis=-1)
+        out = np.empty((time_steps, 3))
+        np.matmul(orb, R.T, out=out)
+        return out
+
+    if precision == 'fast':
+        return _trajectory_grid(a, e, i, omega, w, M, time_steps)
+
+    if HAS_JAX:
+        return np.asarray(_trajectory_jax(a, e, i, omega, w, M, time_steps))
+
+    return _trajectory_core(a, e, i, omega, w, M, T, time_steps)
+
+if HAS_JAX:
+    @partial(jax_jit, static_argnames=['n'])
+    def _trajectory_jax(a, e, i, omega, w, M, n):
+        """
+        XLA-compiled trajectory kernel: the whole Kepler solve, rotation and
+        stacking fuse into a single kernel.
+        """
+        M_arr = M + 2 * jnp.pi * jnp.linspace(0, 1, n)
+        E = lax.fori_loop(
+            0, 8,
+            lambda k, E: E - (E - e * jnp.sin(E) - M_arr) / (1 - e * jnp.cos(E)),
+            M_arr
+        )
+        cos_E = jnp.cos(E)
+        sin_E = jnp.sin(E)
+        r = a * (1 - e * cos_E)
+
+        cos_i, sin_i = jnp.cos(i), jnp.sin(i)
+        cos_omega, sin_omega = jnp.cos(omega), jnp.sin(omega)
+        cos_w, sin_w = jnp.cos(w), jnp.sin(w)
+        R = jnp.array([
+            [cos_w * cos_omega - sin_w * sin_omega * cos_i, -(sin_w * cos_omega + cos_w * sin_omega * cos_i), 0],
+            [cos_w * sin_omega + sin_w * cos_omega * cos_i, cos_w * cos_omega - sin_w * sin_omega * cos_i, 0],
+            [sin_w * sin_i, cos_w * sin_i, 0]
+        ])
+
+        orb = jnp.stack([r * cos_E, r * sin_E, jnp.zeros_like(r)])
+        return (R @ orb).T
+
+@lru_cache(maxsize=32)
+def _eccentric_anomalies(M: float, e: float, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    cos/sin of the eccentric anomaly over one period. The deflection
+    comparison re-solves the same (M, e) with only 'a' changed, so a small
+    cache lets the second trajectory skip the Kepler solve entirely.
+    """
+    M_arr = M + 2 * math.pi * np.linspace(0, 1, n)
+    E = M_arr + e * np.sin(M_arr)
+    for _ in range(8):
+        E -= (E - e * np.sin(E) - M_arr) / (1 - e * np.cos(E))
+    return np.cos(E), np.sin(E)
+
+def _trajectory_grid(a: float, e: float, i: float, omega: float, w: float,
+                     M: float, n: int) -> np.ndarray:
+    """
+    Grid-interpolated variant of _trajectory_core: eccentric anomalies come
+    from the precomputed (M, e) lookup table instead of iteration.
+    """
+    M_arr = M + 2 * math.pi * np.linspace(0, 1, n)
+    _, sin_E, cos_E = solve_kepler_grid(M_arr, e)
+    r = a * (1 - e * cos_E)
+
+    R = _build_rotation_matrix(i, omega, w)
+    orb = np.stack([r * cos_E, r * sin_E, np.zeros_like(r)], axis=-1)
+    out = np.empty((n, 3))
+    np.matmul(orb, R.T, out=out)
+    return out
+
+# Kepler lookup table: E (plus sin/cos) Newton-solved over a uniform (M, e)
+# grid at import time, bilinearly interpolated at runtime. Good to ~1e-4 for
+# bulk sweeps where iterating per sample would dominate.
+_KEP_NM = 1024
+_KEP_NE = 64
+_KEP_E_MAX = 0.99
+_KEP_M_GRID = np.linspace(0, 2 * np.pi, _KEP_NM)
+_KEP_E_GRID = np.linspace(0, _KEP_E_MAX, _KEP_NE)
+
+def _build_kepler_grid() -> np.ndarray:
+    M = _KEP_M_GRID[:, None]
+    e = _KEP_E_GRID[None, :]
+    E = M + e * np.sin(M)
+    for _ in range(12):
+        E -= (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+    return E
+
+_KEP_GRID_E = _build_kepler_grid()
+_KEP_GRID_SIN = np.sin(_KEP_GRID_E)
+_KEP_GRID_COS = np.cos(_KEP_GRID_E)
+
+def solve_kepler_grid(M_arr: np.ndarray, e: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Solve Kepler's equation for a whole array of mean anomalies by bilinear
+    interpolation of the precomputed (M, e) grid.
+
+    Returns:
+        Tuple of arrays (E, sin(E), cos(E)), accurate to ~1e-4
+    """
+    # Both grid axes are uniform, so fractional indices replace searchsorted
+    M_wrapped = np.mod(M_arr, 2 * np.pi)
+    fm = M_wrapped * ((_KEP_NM - 1) / (2 * np.pi))
+    im = np.minimum(fm.astype(np.intp), _KEP_NM - 2)
+    tm = fm - im
+
+    fe = min(max(e, 0.0), _KEP_E_MAX) * ((_KEP_NE - 1) / _KEP_E_MAX)
+    ie = min(int(fe), _KEP_NE - 2)
+    te = fe - ie
+
+    w00 = (1 - tm) * (1 - te)
+    w10 = tm * (1 - te)
+    w01 = (1 - tm) * te
+    w11 = tm * te
+
+    def blend(grid):
+        return (w00 * grid[im, ie] + w10 * grid[im + 1, ie] +
+                w01 * grid[im, ie + 1] + w11 * grid[im + 1, ie + 1])
+
+    return blend(_KEP_GRID_E), blend(_KEP_GRID_SIN), blend(_KEP_GRID_COS)
+
+@njit(cache=True, fastmath=True)
+def _trajectory_core(a: float, e: float, i: float, omega: float, w: float,
+                     M: float, T: float, n: int) -> np.ndarray:
+    """
+    Compiled inner loop of calculate_trajectory: solve Kepler's equation at
+    each time step and rotate into 3D Cartesian space.
+    """
+    # The rotation depends only on i, omega, w - build its entries once
+    # instead of recomputing six trig values per time step
+    cos_i, sin_i = math.cos(i), math.sin(i)
+    cos_omega, sin_omega = math.cos(omega), math.sin(omega)
+    cos_w, sin_w = math.cos(w), math.sin(w)
+    r00 = cos_w * cos_omega - sin_w * sin_omega * cos_i
+    r01 = -(sin_w * cos_omega + cos_w * sin_omega * cos_i)
+    r10 = cos_w * sin_omega + sin_w * cos_omega * cos_i
+    r11 = cos_w * cos_omega - sin_w * sin_omega * cos_i
+    r20 = sin_w * sin_i
+    r21 = cos_w * sin_i
+
+    out = np.empty((n, 3))
+    denom = n - 1 if n > 1 else 1
+    for k in range(n):
+        t = T * k / denom
         E = solve_kepler_equation(M + 2 * math.pi * t / T, e)
-        
-        # Calculate position in orbital plane
+
         r = a * (1 - e * math.cos(E))
         x_orb = r * math.cos(E)
         y_orb = r * math.sin(E)
-        z_orb = 0
-        
-        # Transform to 3D space
-        x, y, z = transform_orbital_to_cartesian(x_orb, y_orb, z_orb, i, omega, w)
-        
-        trajectory.append([x, y, z])
-    
-    return trajectory
 
-def solve_kepler_equation(M: float, e: float, max_iterations: int = 100) -> float:
+        out[k, 0] = r00 * x_orb + r01 * y_orb
+        out[k, 1] = r10 * x_orb + r11 * y_orb
+        out[k, 2] = r20 * x_orb + r21 * y_orb
+    return out
+
+def calculate_trajectories_batch(elements: np.ndarray, time_steps: int = 100) -> np.ndarray:
+    """
+    Calculate trajectories for a whole batch of orbits in one vectorized pass.
+
+    Args:
+        elements: (N, 6) array with columns a, e, i, omega, w, M
+        time_steps: Number of points per trajectory
+
+    Returns:
+        (N, time_steps, 3) array of [x, y, z] coordinates in meters
+    """
+    elements = np.atleast_2d(np.asarray(elements, dtype=np.float64))
+    a = elements[:, 0:1]
+    e = elements[:, 1:2]
+    i, omega, w = elements[:, 2], elements[:, 3], elements[:, 4]
+    M = elements[:, 5:6]
+
+    # Newton-Raphson over the full (N, time_steps) mean-anomaly grid
+    M_arr = M + 2 * math.pi * np.linspace(0, 1, time_steps)[None, :]
+    E = M_arr + e * np.sin(M_arr)
+    for _ in range(8):
+        E -= (E - e * np.sin(E) - M_arr) / (1 - e * np.cos(E))
+
+    cos_E = np.cos(E)
+    sin_E = np.sin(E)
+    r = a * (1 - e * cos_E)
+    orb = np.stack([r * cos_E, r * sin_E, np.zeros_like(r)], axis=-1)  # (N, T, 3)
+
+    # Per-orbit rotation matrices, built exactly like _build_rotation_matrix
+    cos_i, sin_i = np.cos(i), np.sin(i)
+    cos_omega, sin_omega = np.cos(omega), np.sin(omega)
+    cos_w, sin_w = np.cos(w), np.sin(w)
+    R = np.zeros((elements.shape[0], 3, 3))
+    R[:, 0, 0] = cos_w * cos_omega - sin_w * sin_omega * cos_i
+    R[:, 0, 1] = -(sin_w * cos_omega + cos_w * sin_omega * cos_i)
+    R[:, 1, 0] = cos_w * sin_omega + sin_w * cos_omega * cos_i
+    R[:, 1, 1] = cos_w * cos_omega - sin_w * sin_omega * cos_i
+    R[:, 2, 0] = sin_w * sin_i
+    R[:, 2, 1] = cos_w * sin_i
+
+    return np.einsum('nij,ntj->nti', R, orb)
+
+def _build_rotation_matrix(i: float, omega: float, w: float) -> np.ndarray:
+    """
+    Build the 3x3 rotation from orbital-plane to 3D Cartesian coordinates
+    (the third column is zero since the orbital plane has z = 0).
+    """
+    cos_i, sin_i = math.cos(i), math.sin(i)
+    cos_omega, sin_omega = math.cos(omega), math.sin(omega)
+    cos_w, sin_w = math.cos(w), math.sin(w)
+    return np.array([
+        [cos_w * cos_omega - sin_w * sin_omega * cos_i, -(sin_w * cos_omega + cos_w * sin_omega * cos_i), 0],
+        [cos_w * sin_omega + sin_w * cos_omega * cos_i, cos_w * cos_omega - sin_w * sin_omega * cos_i, 0],
+        [sin_w * sin_i, cos_w * sin_i, 0]
+    ])
+
+@njit(cache=True, fastmath=True)
+def solve_kepler_equation(M: float, e: float, max_iterations: int = 12) -> float:
     """
-    Solve Kepler's equation: M = E - e*sin(E)
+    Solve Kepler's equation M = E - e*sin(E) with Newton-Raphson iteration.
     """
-    E = M  # Initial guess
+    E = M + e * math.sin(M)  # One fixed-point step as the initial guess
     for _ in range(max_iterations):
-        E_new = M + e * math.sin(E)
-        if abs(E_new - E) < 1e-8:
+        sin_E = math.sin(E)
+        cos_E = math.cos(E)
+        dE = (E - e * sin_E - M) / (1 - e * cos_E)
+        E -= dE
+        if abs(dE) < 1e-12:
             break
-        E = E_new
     return E
 
-def transform_orbital_to_cartesian(x: float, y: float, z: float, 
+@njit(cache=True, fastmath=True)
+def transform_orbital_to_cartesian(x: float, y: float, z: float,
                                  i: float, omega: float, w: float) -> Tuple[float, float, float]:
     """
     Transform from orbital plane coordinates to 3D Cartesian coordinates.
@@ -175,19 +400,18 @@ def calculate_impact_effects(energy_mt: float, impact_lat: float, impact_lon: fl
     """
     # Determine target type
     target_type = 'water' if elevation < 0 else 'rock'
-    
-    # Calculate crater diameter
-    crater_diameter = estimate_crater_diameter(energy_mt, target_type)
-    
+
+    # Round the energy to 3 significant figures so repeats of quantized
+    # inputs (e.g. UI sliders) hit the memoized scaling laws
+    if energy_mt > 0:
+        energy_rounded = round(energy_mt, 3 - int(math.floor(math.log10(energy_mt))))
+    else:
+        energy_rounded = energy_mt
+    crater_diameter, seismic_magnitude, fireball_radius = _impact_core(energy_rounded, target_type)
+
     # Tsunami risk assessment
     tsunami_risk = elevation < 0 and energy_mt > 10  # Tsunami if underwater and >10 MT
-    
-    # Seismic effects (simplified)
-    seismic_magnitude = 4.5 + 0.67 * math.log10(energy_mt)
-    
-    # Fireball radius (simplified)
-    fireball_radius = 1.5 * (energy_mt**0.4)  # km
-    
+
     return {
         'crater_diameter_km': crater_diameter,
         'tsunami_risk': tsunami_risk,
@@ -196,3 +420,24 @@ def calculate_impact_effects(energy_mt: float, impact_lat: float, impact_lon: fl
         'target_type': target_type,
         'energy_megatons': energy_mt
     }
+
+@lru_cache(maxsize=4096)
+def _impact_core(energy_mt: float, target_type: str) -> Tuple[float, float, float]:
+    """
+    Scalar scaling laws behind calculate_impact_effects: crater diameter,
+    seismic magnitude and fireball radius for a (rounded) energy.
+    """
+    crater_diameter = estimate_crater_diameter(energy_mt, target_type)
+
+    # Seismic effects (simplified)
+    seismic_magnitude = 4.5 + 0.67 * math.log10(energy_mt)
+
+    # Fireball radius (simplified)
+    fireball_radius = _fireball_scaling(energy_mt)
+
+    return crater_diameter, seismic_magnitude, fireball_radius
+
+# Warm up the JITs at import time so the first request doesn't pay compile cost
+_trajectory_core(1.5e11, 0.1, 0.0, 0.0, 0.0, 0.0, 3.0e7, 4)
+if HAS_JAX:
+    _trajectory_jax(1.5e11, 0.1, 0.0, 0.0, 0.0, 0.0, 4).block_until_ready()